@@ -13,16 +13,267 @@ Version: 1.1.0 - Improved Terraform/Infrastructure support
 import os
 import sys
 import json
-import subprocess
 import argparse
+import fnmatch
+import functools
+import itertools
 from pathlib import Path
-from datetime import datetime
 import re
-from typing import Dict, List, Any, Optional, Tuple
-import mimetypes
+import time
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, TextIO, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib json module is the fallback
+    orjson = None
+
 
 __version__ = "1.1.0"
 
+# Queries behind get_git_info: branch, remote, recent commits, porcelain status
+_GIT_QUERIES = [
+    ['git', 'branch', '--show-current'],
+    ['git', 'remote', 'get-url', 'origin'],
+    ['git', 'log', '--oneline', '-10'],
+    ['git', 'status', '--porcelain'],
+]
+
+# The same queries as one shell script, sections separated by \x1e (record
+# separator), so a single process answers all of them
+_GIT_INFO_SCRIPT = (
+    "command -v git >/dev/null 2>&1 || exit 127\n"
+    "git rev-parse || exit 128\n"
+    + "; printf '\\036'\n".join(' '.join(query) for query in _GIT_QUERIES)
+    + "\nexit 0\n"
+)
+
+
+class _NotAGitRepository(Exception):
+    """Raised by the git query backends when repo_path is outside any repository"""
+
+# Syntax-highlighting language by lowercased file suffix
+_EXT_MAP = {
+    '.py': 'python', '.js': 'javascript', '.ts': 'typescript',
+    '.java': 'java', '.go': 'go', '.rs': 'rust', '.rb': 'ruby',
+    '.php': 'php', '.cs': 'csharp', '.cpp': 'cpp', '.c': 'c',
+    '.h': 'c', '.hpp': 'cpp', '.swift': 'swift', '.kt': 'kotlin',
+    '.r': 'r', '.R': 'r', '.sql': 'sql', '.sh': 'bash',
+    '.yml': 'yaml', '.yaml': 'yaml', '.json': 'json',
+    '.xml': 'xml', '.html': 'html', '.css': 'css',
+    '.md': 'markdown', '.rst': 'rst', '.tex': 'latex',
+    '.tf': 'hcl', '.hcl': 'hcl', '.tfvars': 'hcl',
+    '.dockerfile': 'dockerfile', '.Dockerfile': 'dockerfile',
+    '.gradle': 'gradle', '.Makefile': 'makefile', '.makefile': 'makefile',
+    '.toml': 'toml', '.ini': 'ini', '.cfg': 'ini',
+}
+
+# Opening code fence for every language _get_language_for_file can return
+_FENCES = {
+    lang: f"```{lang}\n"
+    for lang in {*_EXT_MAP.values(), 'dockerfile', 'makefile', 'jenkinsfile', 'text'}
+}
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    """Pretty-print obj as JSON with a 2-space indent"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    # orjson never escapes non-ASCII; match it so output does not depend
+    # on which is installed
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _has_magic(pattern: str) -> bool:
+    """Whether a glob pattern contains any wildcard characters"""
+    return any(c in pattern for c in '*?[')
+
+
+def _class_to_regex(body: str) -> str:
+    """Translate the inside of a [...] class the way fnmatch does.
+
+    Empty ranges such as z-a are dropped, so a class left with nothing
+    matches nothing (or any character, when negated) instead of failing
+    to compile.
+    """
+    negate = body.startswith('!')
+    if negate:
+        body = body[1:]
+    items = []
+    i = 0
+    while i < len(body):
+        if i + 2 < len(body) and body[i + 1] == '-':
+            low, high = body[i], body[i + 2]
+            if low <= high:
+                items.append(f'{re.escape(low)}-{re.escape(high)}')
+            i += 3
+        else:
+            items.append(re.escape(body[i]))
+            i += 1
+    if not items:
+        return '[^/]' if negate else '(?!)'
+    # Negated classes still never match the separator
+    return ('[^/' if negate else '[') + ''.join(items) + ']'
+
+
+def _segment_to_regex(segment: str) -> str:
+    """Translate one path segment of a glob, with fnmatch's rules for [...]"""
+    regex = ''
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == '*':
+            regex += '[^/]*'
+        elif c == '?':
+            regex += '[^/]'
+        elif c == '[':
+            j = i
+            if j < n and segment[j] == '!':
+                j += 1
+            if j < n and segment[j] == ']':
+                j += 1
+            while j < n and segment[j] != ']':
+                j += 1
+            if j >= n:
+                # No closing bracket: a literal '['
+                regex += r'\['
+                continue
+            regex += _class_to_regex(segment[i:j])
+            i = j + 1
+        else:
+            regex += re.escape(c)
+    return regex
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a pathlib-style glob into regex source over relative posix paths"""
+    segments = pattern.split('/')
+    regex = ''
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == '**':
+            regex += '.*' if last else '(?:[^/]+/)*'
+        else:
+            regex += _segment_to_regex(segment)
+            if not last:
+                regex += '/'
+    return regex + r'\Z'
+
+
+def _compile_pattern_set(patterns: List[str]) -> Tuple[Dict[str, int], Optional[re.Pattern]]:
+    """Compile glob patterns so a relative path is classified in one step.
+
+    Literal patterns go into a dict and wildcard patterns into one combined
+    regex; both map a matching path back to the index of its pattern.
+    """
+    literals: Dict[str, int] = {}
+    alternatives = []
+    for i, pattern in enumerate(patterns):
+        if _has_magic(pattern):
+            alternatives.append(f'(?P<p{i}>{_glob_to_regex(pattern)})')
+        else:
+            literals.setdefault(pattern, i)
+    return literals, re.compile('|'.join(alternatives)) if alternatives else None
+
+
+def _match_pattern_set(pattern_set: Tuple[Dict[str, int], Optional[re.Pattern]], rel: str) -> Optional[int]:
+    """Return the index of the first pattern in the set matching rel, if any"""
+    literals, wildcards = pattern_set
+    index = literals.get(rel)
+    if wildcards is not None:
+        match = wildcards.match(rel)
+        if match and (index is None or int(match.lastgroup[1:]) < index):
+            index = int(match.lastgroup[1:])
+    return index
+
+
+# Verdict of one .gitignore for a path relative to its directory: True if
+# ignored, False if re-included by a '!' pattern, None if no pattern matches
+_GitignoreMatcher = Callable[[str, bool], Optional[bool]]
+# The .gitignore files above a directory: (relative dir prefix, matcher) pairs
+_IgnoreRules = Tuple[Tuple[str, _GitignoreMatcher], ...]
+
+
+def _compile_gitignore(lines: List[str]) -> _GitignoreMatcher:
+    """Compile the lines of one .gitignore into a matcher(rel, is_dir).
+
+    Uses pathspec when it is installed; otherwise a minimal matcher that
+    covers comments, negation, anchoring, directory-only patterns and
+    [...] classes.
+    """
+    try:
+        import pathspec
+    except ImportError:
+        pass
+    else:
+        if hasattr(pathspec, 'GitIgnoreSpec'):
+            compile_spec = pathspec.GitIgnoreSpec.from_lines
+        else:
+            compile_spec = functools.partial(pathspec.PathSpec.from_lines, 'gitwildmatch')
+        try:
+            spec = compile_spec(lines)
+        except (ValueError, re.error):
+            # Like git, treat a malformed line as matching nothing: keep
+            # only the lines that compile on their own
+            valid = []
+            for line in lines:
+                try:
+                    compile_spec([line])
+                except (ValueError, re.error):
+                    continue
+                valid.append(line)
+            spec = compile_spec(valid)
+        if hasattr(spec, 'check_file'):
+            return lambda rel, is_dir: spec.check_file(rel + '/' if is_dir else rel).include
+        # pathspec < 0.12 cannot tell "re-included" from "not matched"
+        return lambda rel, is_dir: True if spec.match_file(rel + '/' if is_dir else rel) else None
+
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate or line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        # A slash anywhere but the end anchors the pattern to the root;
+        # otherwise it matches at any depth
+        if '/' not in line:
+            line = '**/' + line
+        try:
+            regex = re.compile(_glob_to_regex(line.lstrip('/')))
+        except re.error:
+            # Like git, a malformed line matches nothing
+            continue
+        rules.append((regex, negate, dir_only))
+
+    if not rules:
+        return lambda rel, is_dir: None
+
+    # Most paths match no rule at all; one combined regex rejects them
+    # before the ordered, last-match-wins walk over the rules
+    any_rule = re.compile('|'.join(f'(?:{regex.pattern})' for regex, _, _ in rules))
+
+    def match(rel: str, is_dir: bool) -> Optional[bool]:
+        if not any_rule.match(rel):
+            return None
+        for regex, negate, dir_only in reversed(rules):
+            if (is_dir or not dir_only) and regex.match(rel):
+                return not negate
+        return None
+
+    return match
+
+
 class RepoContextGenerator:
     """Universal repository context generator for AI assistants"""
     
@@ -30,10 +281,42 @@ class RepoContextGenerator:
                  max_file_size: int = 10000, max_total_size: int = 100000):
         self.repo_path = Path(repo_path).resolve()
         self.output_file = output_file
+        # Files this run writes (the output and the temporary file it is
+        # built in) are kept out of the walk; normalised so they compare
+        # equal to DirEntry.path
+        self._output_path = os.path.abspath(os.path.join(str(self.repo_path), output_file))
+        self._own_paths: Set[str] = {self._output_path}
         self.max_file_size = max_file_size
         self.max_total_size = max_total_size
+        # Fractions of max_total_size at which later sections are cut short
+        self._budget_80 = max_total_size * 0.8
+        self._budget_85 = max_total_size * 0.85
+        self._budget_90 = max_total_size * 0.9
+        self._budget_95 = max_total_size * 0.95
         self.total_size = 0
-        self.context_parts = []
+        self._out: Optional[TextIO] = None
+
+        # File index filled by _scan(): relative posix paths in walk order,
+        # the same paths grouped by suffix, and each path's DirEntry (which
+        # caches its stat result for the rest of the run)
+        self._files: Optional[List[str]] = None
+        self._by_suffix: Dict[str, List[str]] = {}
+        self._entries: Dict[str, os.DirEntry] = {}
+        # Names directly under repo_path, listed on first use
+        self._top_names: Optional[Set[str]] = None
+        # .gitignore matchers in effect inside each directory (keyed by its
+        # relative path), compiled as the walks first reach it
+        self._dir_rules: Dict[str, _IgnoreRules] = {}
+        # File contents read ahead by _prefetch(), consumed on output
+        self._prefetched: Dict[Path, Optional[str]] = {}
+        # Resolved paths already written, so a file matched by several
+        # sections (e.g. versions.tf as key file and as *.tf) appears once
+        self._emitted: Set[str] = set()
+        # Title of a file section whose header waits for its first file, so
+        # a section whose files were all written earlier is left out
+        self._pending_section: Optional[str] = None
+        # Result of detect_project_types(), filled on first call
+        self._project_types: Optional[List[str]] = None
         
         # Project type indicators
         self.project_indicators = {
@@ -89,109 +372,432 @@ class RepoContextGenerator:
             '.min.js', '.min.css', '.map', '.tfstate', '.tfplan',
         }
 
+        # Matchers over relative posix paths: _skip_path_re finds a skipped
+        # directory as any path component, _skip_re additionally matches a
+        # skipped extension at the end of the name. Extensions compare
+        # case-insensitively (IMAGE.PNG) and may span dots (.min.js)
+        skip_dirs_re = r'(?:^|/)(?:' + '|'.join(map(re.escape, self.skip_dirs)) + r')(?:/|$)'
+        self._skip_path_re = re.compile(skip_dirs_re)
+        self._skip_re = re.compile(
+            r'(?i:' + '|'.join(map(re.escape, sorted(self.skip_extensions))) + r')$|' + skip_dirs_re
+        )
+
+        # Configuration files
+        self.config_patterns = [
+            '*.config', '*.conf', 'config.*', 'settings.*',
+            '.eslintrc*', '.prettierrc*', 'tsconfig.json',
+            'webpack.config.js', 'babel.config.js', 'jest.config.js',
+            '.flake8', 'setup.cfg', 'tox.ini', 'pytest.ini',
+            'serverless.yml', 'serverless.yaml', 'sam.yaml', 'sam.yml',
+        ]
+
+        # Terraform/Terragrunt files, most important first
+        self.terraform_patterns = [
+            'terragrunt.hcl',
+            'common.hcl', 'account.hcl', 'backend.hcl', 'empty.hcl',
+            '*.tf', '*.tfvars.example',
+            'modules/*/*.tf',
+            'accounts/**/terragrunt.hcl',
+        ]
+
+        # Policy documents (JSON, YAML)
+        self.policy_patterns = ['policies/**/*.json', 'policies/**/*.yaml', 'policies/**/*.yml']
+
+        # Common entry point files per language
+        self.entry_point_patterns = [
+            # Python
+            ('Python', ['main.py', 'app.py', 'run.py', 'manage.py', '__main__.py', 'cli.py', 'wsgi.py']),
+            # JavaScript/Node
+            ('JavaScript', ['index.js', 'app.js', 'server.js', 'main.js', 'index.ts', 'server.ts']),
+            # Java
+            ('Java', ['**/Main.java', '**/Application.java', 'src/main/java/**/*Application.java']),
+            # Go
+            ('Go', ['main.go', 'cmd/*/main.go']),
+            # Rust
+            ('Rust', ['src/main.rs', 'main.rs']),
+            # C#
+            ('C#', ['Program.cs', '**/Program.cs']),
+            # PHP
+            ('PHP', ['index.php', 'app.php']),
+            # Ruby
+            ('Ruby', ['app.rb', 'application.rb', 'config.ru']),
+        ]
+        # Literal entry points are a single stat each; the wildcard ones are
+        # matched during _scan() instead of walking the tree per pattern
+        self._entry_wildcards = [
+            pattern for _, files in self.entry_point_patterns
+            for pattern in files if _has_magic(pattern)
+        ]
+
+        # _scan() classifies every file once against these compiled sets and
+        # records (pattern index, relative path) hits per set
+        self._pattern_sets = {
+            'important': _compile_pattern_set(self.important_files),
+            'config': _compile_pattern_set(self.config_patterns),
+            'terraform': _compile_pattern_set(self.terraform_patterns),
+            'policy': _compile_pattern_set(self.policy_patterns),
+            'entry': _compile_pattern_set(self._entry_wildcards),
+        }
+        self._hits: Dict[str, List[Tuple[int, str]]] = {name: [] for name in self._pattern_sets}
+
+    def _scan(self) -> List[str]:
+        """Walk the repository once, indexing every file outside skip_dirs"""
+        if self._files is not None:
+            return self._files
+
+        files = []
+        # Same top-down order as os.walk, but the DirEntry objects are kept
+        stack = [(str(self.repo_path), '')]
+        while stack:
+            path, prefix = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = [(e.name, e) for e in it]
+            except OSError:
+                continue
+            entries.sort()
+            rules = self._ignore_rules(prefix[:-1], any(name == '.gitignore' for name, _ in entries))
+
+            subdirs = []
+            for _, entry in entries:
+                rel = prefix + entry.name
+                if entry.is_dir():
+                    # Prune skipped and gitignored subtrees before they are entered
+                    if (entry.name not in self.skip_dirs and not entry.is_symlink()
+                            and not self._is_ignored(rules, rel, True)):
+                        subdirs.append((entry.path, rel + '/'))
+                    continue
+
+                if entry.path in self._own_paths or self._is_ignored(rules, rel, False):
+                    continue
+
+                files.append(rel)
+                self._entries[rel] = entry
+                self._by_suffix.setdefault(os.path.splitext(entry.name)[1], []).append(rel)
+
+                for name, pattern_set in self._pattern_sets.items():
+                    index = _match_pattern_set(pattern_set, rel)
+                    if index is not None:
+                        self._hits[name].append((index, rel))
+
+            stack.extend(reversed(subdirs))
+
+        self._files = files
+        return files
+
+    def _ignore_rules(self, rel_dir: str, has_gitignore: Optional[bool] = None) -> _IgnoreRules:
+        """Return the .gitignore matchers in effect inside rel_dir, outermost first.
+
+        Callers holding a listing of rel_dir pass whether it contains a
+        .gitignore, so directories without one cost no open() call.
+        """
+        rules = self._dir_rules.get(rel_dir)
+        if rules is not None:
+            return rules
+
+        if rel_dir:
+            rules = self._ignore_rules(rel_dir.rpartition('/')[0])
+            names = ['.gitignore'] if has_gitignore is not False else []
+        else:
+            rules = ()
+            # Later lines take precedence, so .gitignore goes after exclude
+            names = [os.path.join('.git', 'info', 'exclude'), '.gitignore']
+
+        lines = []
+        for name in names:
+            try:
+                with open(os.path.join(self.repo_path, rel_dir, name), encoding='utf-8', errors='ignore') as fh:
+                    lines.extend(fh.read().splitlines())
+            except OSError:
+                pass
+        if lines:
+            rules = rules + ((rel_dir + '/' if rel_dir else '', _compile_gitignore(lines)),)
+
+        self._dir_rules[rel_dir] = rules
+        return rules
+
+    @staticmethod
+    def _is_ignored(rules: _IgnoreRules, rel: str, is_dir: bool) -> bool:
+        """Apply .gitignore matchers to a relative path; the deepest file decides"""
+        for base, match in reversed(rules):
+            verdict = match(rel[len(base):], is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def _glob(self, pattern: str) -> Iterator[Path]:
+        """Match a glob pattern relative to the repository root.
+
+        Only the last path segment may contain wildcards; anything that
+        needs the whole tree is classified by _scan() instead.
+        """
+        # Literal paths need a single stat, not the file index
+        if not _has_magic(pattern):
+            path = os.path.join(self.repo_path, pattern)
+            return iter([Path(path)] if os.path.exists(path) else [])
+
+        # A literal directory prefix with one wildcard segment needs only a
+        # single scandir of that directory (e.g. 'k8s/*.yaml')
+        prefix, _, name_pattern = pattern.rpartition('/')
+        if _has_magic(prefix) or '**' in name_pattern:
+            raise ValueError(f"unsupported glob pattern: {pattern!r}")
+        return iter(self._fast_glob(prefix, name_pattern))
+
+    def _fast_glob(self, prefix: str, name_pattern: str) -> List[Path]:
+        """Match files in one literal directory against a wildcard name"""
+        # Keep the same view of the tree as the file index
+        if self._skip_path_re.search(prefix):
+            return []
+
+        parts = prefix.split('/') if prefix else []
+        for i in range(len(parts)):
+            parent_rules = self._ignore_rules('/'.join(parts[:i]))
+            if self._is_ignored(parent_rules, '/'.join(parts[:i + 1]), True):
+                return []
+        rules = self._ignore_rules(prefix)
+
+        directory = os.path.join(str(self.repo_path), *parts)
+        base = prefix + '/' if prefix else ''
+        try:
+            with os.scandir(directory) as it:
+                names = [
+                    e.name for e in it
+                    if fnmatch.fnmatchcase(e.name, name_pattern)
+                    and e.path not in self._own_paths and e.is_file()
+                    and not self._is_ignored(rules, base + e.name, False)
+                ]
+        except OSError:
+            return []
+
+        names.sort()
+        return [Path(directory, name) for name in names]
+
+    def _top_level_names(self) -> Set[str]:
+        """Return the names directly under the repository root"""
+        if self._top_names is None:
+            try:
+                self._top_names = set(os.listdir(self.repo_path))
+            except OSError:
+                self._top_names = set()
+        return self._top_names
+
+    def _has_match(self, pattern: str, top: Set[str]) -> bool:
+        """Tell whether a wildcard indicator matches anything, stopping at the first hit"""
+        if '/' not in pattern:
+            return any(fnmatch.fnmatch(name, pattern) for name in top)
+        return next(self._glob(pattern), None) is not None
+
     def detect_project_types(self) -> List[str]:
         """Detect project types based on characteristic files"""
+        # Computed once per run; save() and generate_context() both ask
+        if self._project_types is not None:
+            return list(self._project_types)
+
         detected = []
+        top = self._top_level_names()
         
         for proj_type, indicators in self.project_indicators.items():
-            for indicator in indicators:
-                if '*' in indicator:
-                    if list(self.repo_path.glob(indicator)):
-                        detected.append(proj_type)
-                        break
-                elif (self.repo_path / indicator).exists():
-                    detected.append(proj_type)
-                    break
+            # Cheapest checks first: exact names, then root-level wildcards,
+            # both answered from one directory listing
+            literals = [i for i in indicators if not _has_magic(i)]
+            patterns = [i for i in indicators if _has_magic(i)]
+            if any(name in top for name in literals):
+                detected.append(proj_type)
+            elif any(self._has_match(p, top) for p in patterns):
+                detected.append(proj_type)
                     
-        return detected
+        self._project_types = detected
+        return list(detected)
 
     def get_directory_structure(self, max_depth: int = 4) -> str:
         """Generate a tree structure of the repository"""
         tree_lines = []
-        
-        def build_tree(path: Path, prefix: str = "", depth: int = 0):
-            if depth > max_depth:
-                return
-                
+        max_lines = 150
+        root_len = len(str(self.repo_path)) + 1
+
+        def visible_entries(path: str) -> Iterator[Tuple[bool, os.DirEntry]]:
+            rel_dir = path[root_len:].replace(os.sep, '/')
+            base = rel_dir + '/' if rel_dir else ''
             try:
-                items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name))
-                
-                for i, item in enumerate(items):
-                    # Skip hidden files/dirs except important ones
-                    if item.name.startswith('.') and item.name not in ['.github', '.gitlab-ci.yml', '.env.example', '.circleci']:
-                        continue
-                        
-                    # Skip excluded directories
-                    if item.name in self.skip_dirs:
-                        continue
-                        
-                    # Skip files with excluded extensions
-                    if item.is_file() and item.suffix in self.skip_extensions:
-                        continue
-                    
-                    is_last = i == len(items) - 1
-                    current = "└── " if is_last else "├── "
-                    tree_lines.append(f"{prefix}{current}{item.name}")
-                    
-                    if item.is_dir() and depth < max_depth:
-                        extension = "    " if is_last else "│   "
-                        build_tree(item, prefix + extension, depth + 1)
-                        
+                # DirEntry type checks reuse d_type from the directory stream,
+                # so no per-entry stat() is needed for sorting or filtering
+                with os.scandir(path) as it:
+                    entries = [(not e.is_dir(follow_symlinks=False), e.name, e) for e in it]
             except PermissionError:
-                pass
-        
+                return iter(())
+            # Dirs first, then by name; names are unique so entries never compare
+            entries.sort()
+            rules = self._ignore_rules(rel_dir, any(name == '.gitignore' for _, name, _ in entries))
+
+            # The is_dir flag travels with each entry, so printing never
+            # asks the DirEntry again
+            return (
+                (not is_file, entry) for is_file, _, entry in entries
+                if entry.path not in self._own_paths
+                # Skip hidden files/dirs except important ones
+                and not (entry.name.startswith('.') and entry.name not in ['.github', '.gitlab-ci.yml', '.env.example', '.circleci'])
+                # Skip excluded directories, and excluded extensions on files
+                # only (a directory such as data.bak/ is still listed)
+                and not (self._skip_re if is_file else self._skip_path_re).search(entry.name)
+                # Skip whatever the repository's .gitignore files exclude
+                and not self._is_ignored(rules, base + entry.name, not is_file)
+            )
+
         tree_lines.append(self.repo_path.name + "/")
-        build_tree(self.repo_path)
-        
+
+        # Explicit stack instead of recursion. Each frame is a directory's
+        # remaining visible entries, the (is_dir, entry) pair to print next
+        # (one entry of lookahead tells whether it is the last), its prefix
+        # and depth.
+        root_entries = visible_entries(str(self.repo_path))
+        stack = [(root_entries, next(root_entries, None), "", 0)]
+
+        # Stop descending once the line budget is spent
+        while stack and len(tree_lines) <= max_lines:
+            visible, item, prefix, depth = stack.pop()
+            if item is None:
+                continue
+            is_dir, entry = item
+
+            following = next(visible, None)
+            is_last = following is None
+            current = "└── " if is_last else "├── "
+            tree_lines.append(f"{prefix}{current}{entry.name}")
+
+            # Resume this directory once the subtree below has been printed
+            stack.append((visible, following, prefix, depth))
+
+            if is_dir and depth < max_depth:
+                extension = "    " if is_last else "│   "
+                children = visible_entries(entry.path)
+                stack.append((children, next(children, None), prefix + extension, depth + 1))
+
         # Limit tree size
-        if len(tree_lines) > 150:
-            tree_lines = tree_lines[:150] + ["... (truncated)"]
+        if len(tree_lines) > max_lines:
+            tree_lines = tree_lines[:max_lines] + ["... (truncated)"]
             
         return "\n".join(tree_lines)
 
-    def get_file_content(self, file_path: Path, max_lines: int = 50) -> Optional[str]:
-        """Safely read file content with size limits"""
+    def get_file_content(self, file_path: Path, max_lines: int = 50,
+                         known_size: Optional[int] = None) -> Optional[str]:
+        """Safely read file content with size limits.
+
+        Callers that already hold the file's size (e.g. from a cached
+        DirEntry stat) pass it as known_size, so oversized files are
+        rejected without being opened.
+        """
         try:
             # Skip if in skip directories
-            if any(skip_dir in str(file_path) for skip_dir in ['.terragrunt-cache', '.terraform']):
+            rel = os.path.relpath(file_path, self.repo_path).replace(os.sep, '/')
+            if self._skip_path_re.search(rel):
                 return None
+
+            if known_size is not None and known_size > self.max_file_size:
+                return f"(File too large: {known_size:,} bytes)"
                 
-            # Check file size first
-            file_size = file_path.stat().st_size
-            if file_size > self.max_file_size:
+            file_size, data = self._read_with_size_cap(file_path)
+            if data is None:
                 return f"(File too large: {file_size:,} bytes)"
-                
-            # Try to read as text
-            content = file_path.read_text(encoding='utf-8', errors='ignore')
-            lines = content.split('\n')
-            
-            if len(lines) > max_lines:
-                return '\n'.join(lines[:max_lines]) + f"\n\n... (truncated, {len(lines) - max_lines} more lines)"
+
+            # Locate the end of line max_lines with C-level find() calls on
+            # the raw bytes, so no per-line list is built and only the kept
+            # prefix is decoded; the tail is only counted. A newline byte is
+            # never part of a multi-byte UTF-8 sequence, so the cut is safe.
+            end = -1
+            for _ in range(max_lines):
+                end = data.find(b'\n', end + 1)
+                if end < 0:
+                    break
+            if end >= 0 and end + 1 < len(data):
+                remaining = data.count(b'\n', end + 1) + (not data.endswith(b'\n'))
+                content = data[:end].decode('utf-8', 'ignore')
+                return content + f"\n\n... (truncated, {remaining} more lines)"
             
-            return content
+            return data.decode('utf-8', 'ignore')
             
         except Exception as e:
             return f"(Error reading file: {str(e)})"
 
+    def _read_with_size_cap(self, file_path: Path) -> Tuple[int, Optional[bytes]]:
+        """Read at most max_file_size + 1 bytes of a file.
+
+        Returns the file size and its bytes with line endings normalised to
+        \n (as a text-mode read would), or None in place of the bytes when
+        the file is larger than max_file_size.
+        """
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # One byte past the cap is enough to tell the file is too large;
+            # only then is fstat() needed, for the size in the message
+            chunks = []
+            remaining = self.max_file_size + 1
+            while remaining > 0:
+                chunk = os.read(fd, remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            if remaining <= 0:
+                return os.fstat(fd).st_size, None
+        finally:
+            os.close(fd)
+
+        data = b''.join(chunks)
+        size = len(data)
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return size, data
+
     def extract_package_info(self) -> Dict[str, Any]:
         """Extract package/dependency information based on project type"""
         info = {}
+        # Existence checks come from the cached root listing; each file
+        # that is present is read exactly once
+        top = self._top_level_names()
+        root = str(self.repo_path)
+
+        def read_bytes(name: str) -> bytes:
+            with open(os.path.join(root, name), 'rb') as fh:
+                return fh.read()
         
         # Python
-        if (self.repo_path / "requirements.txt").exists():
-            reqs = (self.repo_path / "requirements.txt").read_text().split('\n')
+        if "requirements.txt" in top:
+            reqs = read_bytes("requirements.txt").decode('utf-8', 'ignore').split('\n')
             deps = [r.strip() for r in reqs if r.strip() and not r.startswith('#')]
             info['python_requirements'] = deps[:20]
             
-        if (self.repo_path / "pyproject.toml").exists():
-            content = (self.repo_path / "pyproject.toml").read_text()
-            if '[project]' in content:
-                info['python_project'] = "pyproject.toml found"
+        if "pyproject.toml" in top:
+            content = read_bytes("pyproject.toml").decode('utf-8', 'ignore')
+            # Imported only when there is a pyproject.toml to parse
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11 keeps the plain '[project]' check
+                tomllib = None
+            if tomllib is None:
+                if '[project]' in content:
+                    info['python_project'] = "pyproject.toml found"
+            else:
+                try:
+                    project = tomllib.loads(content).get('project')
+                except tomllib.TOMLDecodeError:
+                    project = None
+                    info['python_project'] = "pyproject.toml found but couldn't parse"
+                if project:
+                    # Valid TOML can still hold the wrong shapes here
+                    deps = project.get('dependencies', []) if isinstance(project, dict) else None
+                    if isinstance(deps, list):
+                        info['python_project'] = {
+                            'name': project.get('name', 'Unknown'),
+                            'version': project.get('version', 'Unknown'),
+                            'dependencies': deps[:20],
+                        }
+                    else:
+                        info['python_project'] = "pyproject.toml found but couldn't parse"
                 
         # Node.js
-        if (self.repo_path / "package.json").exists():
+        if "package.json" in top:
             try:
-                pkg = json.loads((self.repo_path / "package.json").read_text())
+                pkg = _json_loads(read_bytes("package.json"))
                 info['node_package'] = {
                     'name': pkg.get('name', 'Unknown'),
                     'version': pkg.get('version', 'Unknown'),
@@ -204,24 +810,24 @@ class RepoContextGenerator:
                 info['node_package'] = "package.json found but couldn't parse"
                 
         # Java
-        if (self.repo_path / "pom.xml").exists():
+        if "pom.xml" in top:
             info['java_maven'] = "pom.xml found"
             
-        if (self.repo_path / "build.gradle").exists():
+        if "build.gradle" in top:
             info['java_gradle'] = "build.gradle found"
             
         # Go
-        if (self.repo_path / "go.mod").exists():
-            content = (self.repo_path / "go.mod").read_text().split('\n')
+        if "go.mod" in top:
+            content = read_bytes("go.mod").decode('utf-8', 'ignore').split('\n')
             if content:
                 info['go_module'] = content[0].replace('module ', '').strip()
                 
         # Terraform
-        if (self.repo_path / "versions.tf").exists() or (self.repo_path / "terragrunt.hcl").exists():
+        if "versions.tf" in top or "terragrunt.hcl" in top:
             info['terraform'] = {
-                'has_terragrunt': (self.repo_path / "terragrunt.hcl").exists(),
-                'has_versions_tf': (self.repo_path / "versions.tf").exists(),
-                'modules': [d.name for d in (self.repo_path / "modules").iterdir() if d.is_dir()] if (self.repo_path / "modules").exists() else []
+                'has_terragrunt': "terragrunt.hcl" in top,
+                'has_versions_tf': "versions.tf" in top,
+                'modules': [d.name for d in os.scandir(os.path.join(root, "modules")) if d.is_dir()] if "modules" in top else []
             }
                 
         return info
@@ -231,156 +837,211 @@ class RepoContextGenerator:
         git_info = {}
         
         try:
-            # Check if it's a git repository
-            subprocess.run(['git', 'rev-parse'], cwd=self.repo_path, 
-                         capture_output=True, check=True)
-            
-            # Get current branch
-            result = subprocess.run(
-                ['git', 'branch', '--show-current'],
-                cwd=self.repo_path, capture_output=True, text=True
-            )
-            git_info['branch'] = result.stdout.strip()
-            
-            # Get remote URL
-            result = subprocess.run(
-                ['git', 'remote', 'get-url', 'origin'],
-                cwd=self.repo_path, capture_output=True, text=True
-            )
-            git_info['remote'] = result.stdout.strip()
-            
-            # Get last commit
-            result = subprocess.run(
-                ['git', 'log', '-1', '--oneline'],
-                cwd=self.repo_path, capture_output=True, text=True
-            )
-            git_info['last_commit'] = result.stdout.strip()
-            
-            # Get recent commits
-            result = subprocess.run(
-                ['git', 'log', '--oneline', '-10'],
-                cwd=self.repo_path, capture_output=True, text=True
-            )
-            git_info['recent_commits'] = result.stdout.strip()
-            
-            # Get changed files
-            result = subprocess.run(
-                ['git', 'status', '--porcelain'],
-                cwd=self.repo_path, capture_output=True, text=True
-            )
-            changed = result.stdout.strip()
+            sections = self._git_queries_via_pygit2()
+            if sections is None:
+                sections = self._git_queries_via_shell()
+            if sections is None:
+                sections = self._git_queries_in_parallel()
+
+            branch, remote, recent, changed = sections
+            git_info['branch'] = branch
+            git_info['remote'] = remote
+            git_info['last_commit'] = recent.split('\n', 1)[0]
+            git_info['recent_commits'] = recent
             if changed:
                 git_info['changed_files'] = len(changed.split('\n'))
             
-        except subprocess.CalledProcessError:
+        except _NotAGitRepository:
             git_info['error'] = "Not a git repository"
         except FileNotFoundError:
             git_info['error'] = "Git not installed"
             
         return git_info
 
+    def _git_queries_via_pygit2(self) -> Optional[List[str]]:
+        """Answer the git queries in-process through libgit2.
+
+        Returns None when pygit2 is not installed or cannot read the
+        repository, so the git CLI is used instead.
+        """
+        try:
+            import pygit2
+        except ImportError:
+            return None
+
+        path = pygit2.discover_repository(str(self.repo_path))
+        if path is None:
+            raise _NotAGitRepository(self.repo_path)
+
+        def subject(message: str) -> str:
+            # Same as git's %s: the first paragraph folded onto one line
+            paragraph = message.strip().split('\n\n', 1)[0]
+            return ' '.join(line.strip() for line in paragraph.splitlines())
+
+        try:
+            repo = pygit2.Repository(path)
+            if repo.head_is_unborn:
+                branch = repo.references['HEAD'].target.replace('refs/heads/', '', 1)
+                recent = ''
+            else:
+                branch = '' if repo.head_is_detached else repo.head.shorthand
+                commits = itertools.islice(repo.walk(repo.head.target, pygit2.GIT_SORT_TIME), 10)
+                recent = '\n'.join(f"{c.short_id} {subject(c.message)}" for c in commits)
+            remote = next((r.url for r in repo.remotes if r.name == 'origin'), None) or ''
+            try:
+                # 'normal' collapses untracked directories like --porcelain
+                status = repo.status(untracked_files='normal')
+            except TypeError:  # pygit2 < 1.14
+                status = repo.status()
+            changed = '\n'.join(status)
+        except pygit2.GitError:
+            return None
+
+        return [branch, remote, recent, changed]
+
+    def _git_queries_via_shell(self) -> Optional[List[str]]:
+        """Run every git query in one shell process.
+
+        Returns None when no POSIX shell is available.
+        """
+        # Imported here so runs that never query git don't pay for it
+        import subprocess
+
+        try:
+            result = subprocess.run(
+                ['sh', '-c', _GIT_INFO_SCRIPT],
+                cwd=self.repo_path, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, check=False
+            )
+        except FileNotFoundError:
+            return None
+
+        if result.returncode == 127:
+            raise FileNotFoundError('git')
+        if result.returncode != 0:
+            raise _NotAGitRepository(self.repo_path)
+
+        return [section.strip() for section in result.stdout.split('\x1e', len(_GIT_QUERIES) - 1)]
+
+    def _git_queries_in_parallel(self) -> List[str]:
+        """Run the git queries as separate, concurrent processes"""
+        import subprocess
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Check if it's a git repository
+        check = subprocess.run(['git', 'rev-parse'], cwd=self.repo_path,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        if check.returncode != 0:
+            raise _NotAGitRepository(self.repo_path)
+
+        def run(query: List[str]) -> str:
+            # stderr is never read, so it is not piped back either
+            result = subprocess.run(query, cwd=self.repo_path, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, check=False)
+            return result.stdout.strip()
+
+        # The spawns are independent, so their fork/exec costs overlap
+        with ThreadPoolExecutor(max_workers=len(_GIT_QUERIES)) as pool:
+            return list(pool.map(run, _GIT_QUERIES))
+
     def find_entry_points(self) -> List[Tuple[str, str]]:
         """Find common entry point files"""
         entry_points = []
-        
-        patterns = [
-            # Python
-            ('Python', ['main.py', 'app.py', 'run.py', 'manage.py', '__main__.py', 'cli.py', 'wsgi.py']),
-            # JavaScript/Node
-            ('JavaScript', ['index.js', 'app.js', 'server.js', 'main.js', 'index.ts', 'server.ts']),
-            # Java
-            ('Java', ['**/Main.java', '**/Application.java', 'src/main/java/**/*Application.java']),
-            # Go
-            ('Go', ['main.go', 'cmd/*/main.go']),
-            # Rust
-            ('Rust', ['src/main.rs', 'main.rs']),
-            # C#
-            ('C#', ['Program.cs', '**/Program.cs']),
-            # PHP
-            ('PHP', ['index.php', 'app.php']),
-            # Ruby
-            ('Ruby', ['app.rb', 'application.rb', 'config.ru']),
-        ]
-        
-        for lang, files in patterns:
+
+        # First three scanned files per wildcard pattern, in walk order
+        self._scan()
+        wildcard_hits: Dict[str, List[str]] = {}
+        for index, rel in self._hits['entry']:
+            matches = wildcard_hits.setdefault(self._entry_wildcards[index], [])
+            if len(matches) < 3:
+                matches.append(rel)
+
+        for lang, files in self.entry_point_patterns:
             for pattern in files:
-                if '*' in pattern:
-                    matches = list(self.repo_path.glob(pattern))[:3]
-                    for match in matches:
-                        if not any(skip in str(match) for skip in self.skip_dirs):
-                            entry_points.append((lang, str(match.relative_to(self.repo_path))))
+                if pattern in wildcard_hits:
+                    matches = wildcard_hits[pattern]
+                elif not _has_magic(pattern) and os.path.exists(os.path.join(self.repo_path, pattern)):
+                    matches = [pattern]
                 else:
-                    file_path = self.repo_path / pattern
-                    if file_path.exists():
-                        entry_points.append((lang, pattern))
-                        
+                    continue
+                entry_points.extend((lang, rel) for rel in matches)
+
         return entry_points
 
+    def _bucket_files(self, name: str, per_pattern: Optional[int] = None) -> List[Path]:
+        """Return the scanned files matched by one pattern set, in pattern order"""
+        self._scan()
+        files = []
+        counts: Dict[int, int] = {}
+        # Stable sort: files matched by the same pattern keep walk order
+        for index, rel in sorted(self._hits[name], key=lambda hit: hit[0]):
+            if per_pattern is not None:
+                if counts.get(index, 0) >= per_pattern:
+                    continue
+                counts[index] = counts.get(index, 0) + 1
+            files.append(self.repo_path / rel)
+        return files
+
     def _find_terraform_files(self) -> List[Path]:
         """Find Terraform and Terragrunt files"""
-        terraform_files = []
-        
-        # Root terragrunt.hcl is most important
-        root_terragrunt = self.repo_path / "terragrunt.hcl"
-        if root_terragrunt.exists():
-            terraform_files.append(root_terragrunt)
-        
-        # Other important root HCL files
-        for hcl_file in ['common.hcl', 'account.hcl', 'backend.hcl', 'empty.hcl']:
-            file_path = self.repo_path / hcl_file
-            if file_path.exists():
-                terraform_files.append(file_path)
-        
-        # Root terraform files
-        for pattern in ['*.tf', '*.tfvars.example']:
-            terraform_files.extend(self.repo_path.glob(pattern))
-        
-        # Module files
-        modules_dir = self.repo_path / "modules"
-        if modules_dir.exists():
-            for module_dir in modules_dir.iterdir():
-                if module_dir.is_dir():
-                    # Add main.tf first, then others
-                    main_tf = module_dir / "main.tf"
-                    if main_tf.exists():
-                        terraform_files.append(main_tf)
-                    for tf_file in module_dir.glob("*.tf"):
-                        if tf_file.name != "main.tf":
-                            terraform_files.append(tf_file)
-        
-        # Account terragrunt files (excluding cache)
-        for tg_file in self.repo_path.glob("accounts/**/terragrunt.hcl"):
-            if '.terragrunt-cache' not in str(tg_file):
-                terraform_files.append(tg_file)
-                
-        return terraform_files[:30]  # Increased limit for terraform projects
+        self._scan()
+        # Pattern order first; within a directory main.tf leads the others
+        hits = sorted(
+            self._hits['terraform'],
+            key=lambda hit: (hit[0], os.path.dirname(hit[1]), os.path.basename(hit[1]) != 'main.tf'),
+        )
+        return [self.repo_path / rel for _, rel in hits[:30]]  # Increased limit for terraform projects
 
     def _find_policy_files(self) -> List[Path]:
         """Find policy files (JSON, YAML)"""
-        policy_files = []
-        
-        # Check policies directory
-        policies_dir = self.repo_path / "policies"
-        if policies_dir.exists():
-            for ext in ['*.json', '*.yaml', '*.yml']:
-                policy_files.extend(policies_dir.glob(f"**/{ext}"))
-                
-        return [f for f in policy_files if '.git' not in str(f)][:15]
+        return self._bucket_files('policy')[:15]
+
+    def _write(self, text: str):
+        """Write text straight to the output stream, counting it once"""
+        self._out.write(text)
+        self.total_size += len(text)
 
     def add_section(self, title: str, content: str):
         """Add a section to the context output"""
-        self.context_parts.append(f"\n## {title}\n")
-        self.context_parts.append(content)
-        self.total_size += len(title) + len(content)
+        self._write(f"\n## {title}\n")
+        self._write(content)
 
-    def generate_context(self) -> str:
-        """Generate the complete context document"""
-        # Header
+    def _run_lookups(self) -> Tuple[str, Dict[str, str], Dict[str, Any], List[Tuple[str, str]]]:
+        """Return the directory tree, git info, package info and entry points"""
+        # Imported here like subprocess: it pulls in logging at import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The git process and the tree walk mostly wait on the OS, so run the
+        # independent lookups side by side and consume them in document order
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            tree_future = pool.submit(self.get_directory_structure)
+            git_future = pool.submit(self.get_git_info)
+            package_future = pool.submit(self.extract_package_info)
+            entry_future = pool.submit(self.find_entry_points)
+        return tree_future.result(), git_future.result(), package_future.result(), entry_future.result()
+
+    def generate_context(self, out: TextIO, lookups: Optional[Tuple] = None) -> int:
+        """Generate the complete context document, streaming it to out.
+
+        lookups is the result of _run_lookups(), for callers that must run
+        them before out exists. Returns the number of characters written.
+        """
         project_types = self.detect_project_types()
+        if lookups is None:
+            lookups = self._run_lookups()
+        tree, git_info, package_info, entry_points = lookups
+
+        self._out = out
+        self.total_size = 0
+        self._emitted.clear()
+        self._prefetched.clear()
+        self._pending_section = None
+
+        # Header
         header = f"""# Repository Context
 
 **Generated by:** Repo Context Generator v{__version__}  
-**Generated at:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
+**Generated at:** {time.strftime('%Y-%m-%d %H:%M:%S')}  
 **Repository:** {self.repo_path.name}  
 **Path:** {self.repo_path}  
 **Detected Types:** {', '.join(project_types) if project_types else 'Generic'}
@@ -391,13 +1052,12 @@ This context file provides a comprehensive overview of the repository structure
 for use with AI assistants.
 
 """
-        self.context_parts.append(header)
+        self._write(header)
 
         # Project Structure
-        self.add_section("Project Structure", f"```\n{self.get_directory_structure()}\n```")
+        self.add_section("Project Structure", f"```\n{tree}\n```")
 
         # Git Information
-        git_info = self.get_git_info()
         if git_info and 'error' not in git_info:
             git_section = []
             if 'branch' in git_info:
@@ -414,175 +1074,200 @@ for use with AI assistants.
             self.add_section("Git Information", '\n'.join(git_section))
 
         # Package Information
-        package_info = self.extract_package_info()
         if package_info:
-            self.add_section("Package Information", f"```json\n{json.dumps(package_info, indent=2)}\n```")
+            self.add_section("Package Information", f"```json\n{_json_dumps(package_info)}\n```")
 
         # Entry Points
-        entry_points = self.find_entry_points()
         if entry_points:
             ep_content = []
             for lang, file in entry_points:
                 ep_content.append(f"- **{lang}:** `{file}`")
             self.add_section("Entry Points", '\n'.join(ep_content))
 
+        # Size budget checkpoints, as locals for the emit loops below
+        b80, b85, b90, b95 = self._budget_80, self._budget_85, self._budget_90, self._budget_95
+
         # Key Files - Prioritize STATUS.md first
         self.add_section("Key Files", "")
         
-        # First, always try to add STATUS.md if it exists
         status_file = self.repo_path / "STATUS.md"
-        if status_file.exists() and self.total_size < self.max_total_size * 0.8:
+        important_files = self._bucket_files('important', per_pattern=3)
+        self._prefetch(important_files)
+
+        # First, always try to add STATUS.md if it exists; the scan's index
+        # (filled by _bucket_files above) already leaves out ignored files
+        if "STATUS.md" in self._entries and self.total_size < b80:
             self._add_file_content(status_file)
         
-        # Then add other important files
-        for pattern in self.important_files:
-            if self.total_size > self.max_total_size * 0.8:
-                self.context_parts.append("\n*(Reached size limit, some files omitted)*\n")
+        # Then add other important files, up to 3 per pattern
+        for file in important_files:
+            if self.total_size > b80:
+                self._write("\n*(Reached size limit, some files omitted)*\n")
                 break
                 
-            if pattern == "STATUS.md":  # Skip since we already added it
+            if file == status_file:  # Skip since we already added it
                 continue
                 
-            if '*' in pattern:
-                files = list(self.repo_path.glob(pattern))[:3]
-                for file in files:
-                    if not any(skip in str(file) for skip in ['.terragrunt-cache', '.terraform']):
-                        self._add_file_content(file)
-            else:
-                file_path = self.repo_path / pattern
-                if file_path.exists():
-                    self._add_file_content(file_path)
+            self._add_file_content(file)
+        # Read-ahead contents the size budget left unused are dropped with
+        # their section, here and below
+        self._prefetched.clear()
 
         # Terraform/Terragrunt specific files
-        if 'terraform' in project_types and self.total_size < self.max_total_size * 0.85:
+        if 'terraform' in project_types and self.total_size < b85:
             terraform_files = self._find_terraform_files()
             if terraform_files:
-                self.add_section("Terraform/Terragrunt Configuration", "")
+                self._pending_section = "Terraform/Terragrunt Configuration"
+                self._prefetch(terraform_files)
                 for tf_file in terraform_files:
-                    if self.total_size > self.max_total_size * 0.9:
+                    if self.total_size > b90:
                         break
                     self._add_file_content(tf_file)
+                self._prefetched.clear()
             
             # Policy files
             policy_files = self._find_policy_files()
-            if policy_files and self.total_size < self.max_total_size * 0.95:
-                self.add_section("Policy Files", "")
+            if policy_files and self.total_size < b95:
+                self._pending_section = "Policy Files"
+                self._prefetch(policy_files)
                 for policy_file in policy_files:
-                    if self.total_size > self.max_total_size * 0.95:
+                    if self.total_size > b95:
                         break
                     self._add_file_content(policy_file)
+                self._prefetched.clear()
 
         # Configuration Files
         config_files = self._find_config_files()
-        if config_files and self.total_size < self.max_total_size * 0.9:
-            self.add_section("Configuration Files", "")
+        if config_files and self.total_size < b90:
+            self._pending_section = "Configuration Files"
+            self._prefetch(config_files[:10])
             for file in config_files[:10]:
-                if self.total_size > self.max_total_size * 0.9:
+                if self.total_size > b90:
                     break
                 self._add_file_content(file)
+            self._prefetched.clear()
 
         # Source Code Sample
-        if self.total_size < self.max_total_size * 0.9:
+        if self.total_size < b90:
             self._add_source_samples(project_types)
 
         # Footer
+        self._pending_section = None
         footer = f"\n---\n\n*Context generation complete. Total size: {self.total_size:,} characters*\n"
-        self.context_parts.append(footer)
+        self._write(footer)
+
+        return self.total_size
+
+    def _prefetch(self, files: List[Path]):
+        """Read files concurrently ahead of _add_file_content.
 
-        return ''.join(self.context_parts)
+        Contents are handed out (and dropped) by _add_file_content in the
+        caller's order, so the document stays deterministic.
+        """
+        pending = [f for f in files
+                   if f not in self._prefetched and os.path.realpath(f) not in self._emitted]
+        if len(pending) < 2:
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
 
-    def _add_file_content(self, file_path: Path):
+        workers = min(16, (os.cpu_count() or 1) * 4, len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            self._prefetched.update(zip(pending, pool.map(self.get_file_content, pending)))
+
+    def _add_file_content(self, file_path: Path, known_size: Optional[int] = None):
         """Add file content to context"""
-        content = self.get_file_content(file_path)
+        resolved = os.path.realpath(file_path)
+        if resolved in self._emitted:
+            self._prefetched.pop(file_path, None)
+            return
+
+        if file_path in self._prefetched:
+            content = self._prefetched.pop(file_path)
+        else:
+            content = self.get_file_content(file_path, known_size=known_size)
         
         if content and self.total_size + len(content) < self.max_total_size:
+            self._emitted.add(resolved)
+            if self._pending_section is not None:
+                self.add_section(self._pending_section, "")
+                self._pending_section = None
             relative_path = file_path.relative_to(self.repo_path)
             
             # Determine language for syntax highlighting
-            lang = self._get_language_for_file(file_path)
+            lang = self._get_language_for_file(file_path.suffix.lower(), file_path.name)
             
-            self.context_parts.append(f"\n### {relative_path}\n")
-            self.context_parts.append(f"```{lang}\n{content}\n```\n")
-            self.total_size += len(content) + 100
+            self._write(f"\n### {relative_path}\n")
+            self._write(_FENCES[lang] + content + "\n```\n")
 
-    def _get_language_for_file(self, file_path: Path) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _get_language_for_file(suffix: str, name: str) -> str:
         """Determine language for syntax highlighting"""
-        ext_map = {
-            '.py': 'python', '.js': 'javascript', '.ts': 'typescript',
-            '.java': 'java', '.go': 'go', '.rs': 'rust', '.rb': 'ruby',
-            '.php': 'php', '.cs': 'csharp', '.cpp': 'cpp', '.c': 'c',
-            '.h': 'c', '.hpp': 'cpp', '.swift': 'swift', '.kt': 'kotlin',
-            '.r': 'r', '.R': 'r', '.sql': 'sql', '.sh': 'bash',
-            '.yml': 'yaml', '.yaml': 'yaml', '.json': 'json',
-            '.xml': 'xml', '.html': 'html', '.css': 'css',
-            '.md': 'markdown', '.rst': 'rst', '.tex': 'latex',
-            '.tf': 'hcl', '.hcl': 'hcl', '.tfvars': 'hcl',
-            '.dockerfile': 'dockerfile', '.Dockerfile': 'dockerfile',
-            '.gradle': 'gradle', '.Makefile': 'makefile', '.makefile': 'makefile',
-            '.toml': 'toml', '.ini': 'ini', '.cfg': 'ini',
-        }
-        
         # Check full filename first
-        if file_path.name in ['Dockerfile', 'Makefile', 'Jenkinsfile']:
-            return file_path.name.lower()
+        if name in ('Dockerfile', 'Makefile', 'Jenkinsfile'):
+            return name.lower()
             
-        suffix = file_path.suffix.lower()
-        return ext_map.get(suffix, 'text')
+        return _EXT_MAP.get(suffix, 'text')
 
     def _find_config_files(self) -> List[Path]:
         """Find configuration files"""
-        config_patterns = [
-            '*.config', '*.conf', 'config.*', 'settings.*',
-            '.eslintrc*', '.prettierrc*', 'tsconfig.json',
-            'webpack.config.js', 'babel.config.js', 'jest.config.js',
-            '.flake8', 'setup.cfg', 'tox.ini', 'pytest.ini',
-            'serverless.yml', 'serverless.yaml', 'sam.yaml', 'sam.yml',
-        ]
-        
-        config_files = []
-        for pattern in config_patterns:
-            config_files.extend(self.repo_path.glob(pattern))
-            
-        return [f for f in config_files if not any(skip in str(f) for skip in self.skip_dirs)][:20]
+        self._scan()
+        # Filter on the relative strings; Paths are built only for the kept files
+        hits = sorted(self._hits['config'], key=lambda hit: hit[0])
+        kept = (rel for _, rel in hits if not self._skip_re.search(rel))
+        return [self.repo_path / rel for rel in itertools.islice(kept, 20)]
 
     def _add_source_samples(self, project_types: List[str]):
         """Add sample source code based on project type"""
         if not project_types:
             return
             
-        self.add_section("Source Code Samples", "")
+        self._pending_section = "Source Code Samples"
         
-        # Define source patterns for each project type
-        source_patterns = {
-            'python': ['**/*.py'],
-            'javascript': ['**/*.js', '**/*.jsx'],
-            'typescript': ['**/*.ts', '**/*.tsx'],
-            'java': ['**/*.java'],
-            'go': ['**/*.go'],
-            'rust': ['**/*.rs'],
-            'csharp': ['**/*.cs'],
-            'terraform': ['**/*.tf', '**/*.hcl'],
-            'kubernetes': ['**/*.yaml', '**/*.yml'],
+        # Source file extensions for each project type
+        source_suffixes = {
+            'python': ['.py'],
+            'javascript': ['.js', '.jsx'],
+            'typescript': ['.ts', '.tsx'],
+            'java': ['.java'],
+            'go': ['.go'],
+            'rust': ['.rs'],
+            'csharp': ['.cs'],
+            'terraform': ['.tf', '.hcl'],
+            'kubernetes': ['.yaml', '.yml'],
         }
         
+        self._scan()
+        b95 = self._budget_95
         for proj_type in project_types[:2]:  # Limit to first 2 project types
-            if proj_type in source_patterns:
-                patterns = source_patterns[proj_type]
-                
-                for pattern in patterns:
+            if proj_type in source_suffixes:
+                for suffix in source_suffixes[proj_type]:
+                    # Candidates come from the scan's suffix index, ordered
+                    # like sorted Paths (component-wise); stat() only runs
+                    # until 3 usable samples have been found
                     files = []
-                    for f in self.repo_path.glob(pattern):
+                    for rel in sorted(self._by_suffix.get(suffix, []), key=lambda r: r.split('/')):
                         # Skip test files, vendored code, and cache directories
-                        if any(skip in str(f) for skip in ['test', 'vendor', 'node_modules', '__pycache__', '.terragrunt-cache', '.terraform']):
+                        if 'test' in rel or self._skip_re.search(rel):
                             continue
-                        if f.is_file() and f.stat().st_size < 50000:  # Skip large files
-                            files.append(f)
+                        # Files already shown in an earlier section don't
+                        # use up a sample slot
+                        if os.path.realpath(os.path.join(self.repo_path, rel)) in self._emitted:
+                            continue
+                        entry = self._entries[rel]
+                        if entry.is_file():
+                            size = entry.stat().st_size
+                            if size < 50000:  # Skip large files
+                                files.append((self.repo_path / rel, size))
+                                if len(files) == 3:
+                                    break
                             
                     # Add up to 3 sample files
-                    for file in sorted(files)[:3]:
-                        if self.total_size > self.max_total_size * 0.95:
+                    for file, size in files:
+                        if self.total_size > b95:
                             return
-                        self._add_file_content(file)
+                        self._add_file_content(file, known_size=size)
 
     def save(self) -> Path:
         """Generate and save the context file"""
@@ -591,14 +1276,40 @@ for use with AI assistants.
         print(f"🔍 Analyzing repository: {self.repo_path.name}")
         print(f"📁 Path: {self.repo_path}")
         
-        context = self.generate_context()
-        
-        output_path.write_text(context, encoding='utf-8')
+        # The lookups (git status in particular) run before the temporary
+        # file below exists, so they never see it
+        project_types = self.detect_project_types()
+        lookups = self._run_lookups()
+
+        # Sections are written as they are produced instead of being joined
+        # into one large string first. They go to a temporary file next to
+        # the output, which replaces it only once generation has finished,
+        # so a failed run leaves the previous context file intact.
+        import tempfile
+        directory, name = os.path.split(self._output_path)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+        self._own_paths.add(temp_path)
+        try:
+            with open(fd, 'w', encoding='utf-8', buffering=1 << 20) as fh:
+                # mkstemp creates the file private; give it the usual mode
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(temp_path, 0o666 & ~umask)
+                written = self.generate_context(fh, lookups)
+            os.replace(temp_path, self._output_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            self._own_paths.discard(temp_path)
         
         print(f"\n✅ Context file generated successfully!")
         print(f"📄 Output: {output_path}")
-        print(f"📏 Size: {len(context):,} characters")
-        print(f"🎯 Detected types: {', '.join(self.detect_project_types())}")
+        print(f"📏 Size: {written:,} characters")
+        print(f"🎯 Detected types: {', '.join(project_types)}")
         
         return output_path
 